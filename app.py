@@ -1,18 +1,78 @@
 # app.py
+import sys
+
+# `python app.py --prod` serves through gevent; its monkey patching must run
+# before anything else imports the socket/threading modules.
+PROD_MODE = __name__ == "__main__" and "--prod" in sys.argv
+if PROD_MODE:
+    from gevent import monkey
+    monkey.patch_all()
+
+import io
 import os
 import json
 import datetime
-from flask import Flask, render_template, request, jsonify, send_file
-import io
-from logic import analyze_batch, generate_comprehensive_pdf_bytes, get_parameter_names, get_db_version, load_data
+from flask import Flask, render_template, request, jsonify, send_file, Response, abort
+from flask.json.provider import DefaultJSONProvider
+from logic import analyze_batch, generate_comprehensive_pdf_bytes, get_parameter_names, get_parameters_payload, report_filename
+from logic import json_dumps, json_loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Route jsonify() and request.get_json() through logic's orjson-backed codec.
+    Honours the provider's sort_keys, debug-mode indentation and default hook.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return json_dumps(
+            obj,
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            indent=kwargs.get("indent"),
+            default=kwargs.get("default", self.default),
+        ).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return json_loads(s)
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+# Loopback addresses that may see internal metadata such as the DB version.
+_LOCAL_ADDRS = frozenset({"127.0.0.1", "::1"})
+
+# Largest request body accepted by the batch endpoints (1 MiB is thousands of
+# entries). Also enforced by Werkzeug while reading bodies with no Content-Length.
+MAX_BODY_BYTES = 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_BODY_BYTES
+
+
+def _read_json_body():
+    """
+    Parse the JSON request body, rejecting oversized payloads before reading.
+    Returns None for non-JSON or malformed bodies, like get_json(silent=True).
+    """
+    if (request.content_length or 0) > MAX_BODY_BYTES:
+        abort(413)
+    if not request.is_json:
+        return None
+    try:
+        return json_loads(request.get_data(cache=False))
+    except ValueError:
+        return None
 
 
 # ─────────────────────────────────────────────
 # ROUTES
 # ─────────────────────────────────────────────
 
+@app.errorhandler(413)
+def payload_too_large(e):
+    """Keep oversized-body rejections in the same JSON error format as the API."""
+    return jsonify({"error": f"Request body exceeds {MAX_BODY_BYTES} bytes."}), 413
+
+
 @app.route("/")
 def index():
     """Serve the single-page frontend."""
@@ -22,28 +82,35 @@ def index():
 @app.route("/api/parameters", methods=["GET"])
 def api_parameters():
     """Return all parameter names + units for the frontend selector."""
-    data = load_data()
-    params = [{"name": p["name"], "unit": p["unit"]} for p in data]
     # Only include the DB version when running locally (debug) or when
     # the request originates from localhost. This hides internal metadata
     # once the app is hosted publicly while still showing it during local dev.
-    payload = {"parameters": params}
-
-    show_version = False
-    # Prefer explicit debug flag
-    if app.debug:
-        show_version = True
-    else:
-        # Check request origin — allow 127.0.0.1, ::1 or host starting with 'localhost'
-        remote = (request.remote_addr or "")
-        host   = (request.host or "")
-        if remote.startswith("127.") or remote == "::1" or host.startswith("localhost"):
-            show_version = True
-
-    if show_version:
-        payload["db_version"] = get_db_version()
-
-    return jsonify(payload)
+    # Prefer explicit debug flag, then check request origin — allow loopback
+    # addresses (any 127.x) or a host starting with 'localhost'.
+    # Cheapest tests first so the common cases short-circuit.
+    remote       = request.remote_addr or ""
+    show_version = (
+        app.debug
+        or remote in _LOCAL_ADDRS
+        or remote.startswith("127.")
+        or (request.host or "").startswith("localhost")
+    )
+
+    # The serialized body is cached in logic.py until the DB is reloaded.
+    # It only changes with database.json, so the mtime it was built from makes
+    # a cheap ETag; repeat callers get a 304 without the body being sent again.
+    # The two payload variants (with/without version) need distinct tags.
+    mtime, body = get_parameters_payload(show_version)
+    etag = f"{mtime:x}-{'v' if show_version else 'p'}" if mtime is not None else None
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = Response(body, mimetype="application/json")
+    if etag:
+        response.set_etag(etag)
+    return response
 
 
 @app.route("/api/analyze", methods=["POST"])
@@ -55,7 +122,7 @@ def api_analyze():
     Expected body:
     { "batch": [{"name": "pH Level", "value": 7.2}, ...] }
     """
-    body = request.get_json(silent=True)
+    body = _read_json_body()
 
     if not body or "batch" not in body:
         return jsonify({"error": "Request must include a 'batch' array."}), 400
@@ -65,37 +132,16 @@ def api_analyze():
         return jsonify({"error": "Batch must be a non-empty array."}), 400
 
     try:
-        gui_text, pdf_results, val_errors, warnings = analyze_batch(batch_data)
+        # Results come back already in the response shape the frontend expects
+        _, results, val_errors, warnings = analyze_batch(batch_data, build_gui=False, api_shape=True)
     except Exception as e:
         return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
     if val_errors:
         return jsonify({"validation_errors": val_errors}), 422
 
-    # Build clean JSON for frontend
-    response_results = []
-    for res in pdf_results:
-        overall = "FAIL" if any(s["status"] == "FAIL" for s in res["standards"]) else "PASS"
-        response_results.append({
-            "parameter": res["parameter"],
-            "value":     res["value"],
-            "unit":      res["unit"],
-            "status":    overall,
-            "standards": [
-                {
-                    "authority":   s["authority"],
-                    "status":      s["status"],
-                    "limit":       s["limit"],
-                    "violation":   s.get("violation", ""),
-                    "consequence": s.get("consequence", ""),
-                    "solution":    s.get("solution", ""),
-                }
-                for s in res["standards"]
-            ]
-        })
-
     return jsonify({
-        "results":  response_results,
+        "results":  results,
         "warnings": warnings,
     })
 
@@ -109,29 +155,28 @@ def api_report():
     FIX: os.path.abspath() ensures send_file always gets a valid absolute path
     regardless of the process working directory.
     """
-    body = request.get_json(silent=True)
+    body = _read_json_body()
 
     if not body or "batch" not in body:
         return jsonify({"error": "Request must include a 'batch' array."}), 400
 
     try:
-        _, pdf_results, val_errors, warnings = analyze_batch(body["batch"])
+        _, pdf_results, val_errors, warnings = analyze_batch(body["batch"], build_gui=False)
 
         if val_errors:
             return jsonify({"validation_errors": val_errors}), 422
 
-        # Generate PDF bytes in-memory and stream to the client without saving
-        pdf_bytes = generate_comprehensive_pdf_bytes(pdf_results, warnings)
+        # Generate the PDF in-memory and stream to the client without saving.
+        # One timestamp serves both the report header and the download name.
+        generated_at = datetime.datetime.now()
+        pdf_bytes = generate_comprehensive_pdf_bytes(pdf_results, warnings, generated_at)
         if not pdf_bytes:
             return jsonify({"error": "PDF generation failed."}), 500
 
-        buf = io.BytesIO(pdf_bytes)
-        buf.seek(0)
-        filename = f"Analysis_Report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         return send_file(
-            buf,
+            io.BytesIO(pdf_bytes),
             as_attachment=True,
-            download_name=filename,
+            download_name=report_filename(generated_at),
             mimetype="application/pdf"
         )
 
@@ -146,4 +191,11 @@ def api_report():
 # ─────────────────────────────────────────────
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", debug=True, port=5000)
+    if PROD_MODE:
+        # Concurrent server: slow or idle connections no longer stall other
+        # clients. PDF rendering is CPU-bound and still blocks while it runs.
+        # Hosted deployments use gunicorn instead (see Procfile / Dockerfile).
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(("0.0.0.0", 5000), app).serve_forever()
+    else:
+        app.run(host="0.0.0.0", debug=True, port=5000)
@@ -6,6 +6,11 @@ import datetime
 from fpdf import FPDF
 from functools import lru_cache
 
+try:
+    import orjson
+except ImportError:  # stdlib json is the fallback when orjson is not installed
+    orjson = None
+
 DB_FILE = "database.json"
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -30,43 +35,219 @@ _UNICODE_MAP = {
     '\u2122': '(TM)',  # trademark          ™
 }
 
+# Built once so sanitize() can substitute every character in a single pass.
+_TRANS = str.maketrans(_UNICODE_MAP)
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────────────────────────────────────────
 
-@lru_cache(maxsize=1)
-def load_data():
+# Literals the stdlib parser accepts but orjson rejects ("-Infinity" fails
+# at the "I", after the sign).
+_NON_FINITE_LITERALS = ("NaN", "Infinity")
+
+
+def _is_non_finite_error(err):
+    """True if an orjson decode error was caused by NaN, Infinity or e.g. 1e400."""
+    if err.msg.startswith("number is infinity"):
+        return True
+    # err.doc is the decoded text and err.pos a character offset into it
+    return err.doc[err.pos:err.pos + 8].startswith(_NON_FINITE_LITERALS)
+
+
+def json_loads(data):
     """
-    Load and cache the parameters list from database.json.
+    Decode JSON from str/bytes, using orjson when it is available.
+    orjson rejects NaN, Infinity and out-of-range numbers such as 1e400; only
+    those inputs are retried with the stdlib parser, which accepts them
+    (validation then reports them as non-finite). Any other malformed JSON
+    raises orjson's error, a ValueError, without a second parse.
+    """
+    if orjson is None:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError as err:
+        if not _is_non_finite_error(err):
+            raise
+    return json.loads(data)
+
+
+def json_dumps(obj, sort_keys=False, indent=None, default=None):
+    """
+    Encode obj as JSON bytes, using orjson when it is available.
+    Output is compact unless indent is given (orjson only supports 2 spaces).
+    default is called for objects the encoder cannot serialize natively.
+    """
+    if orjson is not None:
+        # Dates and dataclasses go to default, as they do with the stdlib encoder
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    separators = None if indent else (",", ":")
+    return json.dumps(
+        obj, sort_keys=sort_keys, indent=indent, default=default, separators=separators
+    ).encode("utf-8")
+
+
+def _read_payload():
+    """
+    Read and parse database.json, returning (parameters, metadata).
     Supports both the old flat-list format and the new
     {"_metadata": ..., "parameters": [...]} format.
-    Call load_data.cache_clear() if you hot-reload the DB at runtime.
     """
     try:
         with open(DB_FILE, 'r', encoding='utf-8-sig') as f:
-            payload = json.load(f)
-        if isinstance(payload, list):
-            return payload
-        return payload.get("parameters", [])
+            payload = json_loads(f.read())
     except FileNotFoundError:
-        return []
+        return [], {}
+    if isinstance(payload, list):
+        return payload, {}
+    return payload.get("parameters", []), payload.get("_metadata", {})
+
+
+def get_db_mtime():
+    """Return database.json's modification time in nanoseconds, or None if it is missing."""
+    try:
+        return os.stat(DB_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+# Parsed database.json plus the mtime it was read at. "mtime" starts at a
+# value no real stat can return, so the first access always loads the file.
+_CACHE = {"mtime": -1, "parameters": [], "metadata": {}}
+
+
+def _load_payload():
+    """
+    Return the cached (parameters, metadata) pair, re-reading database.json
+    whenever its mtime has changed. A stat per call is far cheaper than a
+    re-parse, and keeps every derived cache consistent with the file on disk.
+    """
+    mtime = get_db_mtime()
+    if mtime != _CACHE["mtime"]:
+        _CACHE["parameters"], _CACHE["metadata"] = _read_payload()
+        _CACHE["mtime"] = mtime
+        _build_param_index.cache_clear()
+        _parameters_payload.cache_clear()
+    return _CACHE["parameters"], _CACHE["metadata"]
+
+
+def clear_db_cache():
+    """Force the next access to re-read database.json and rebuild derived caches."""
+    _CACHE["mtime"] = -1
+    _build_param_index.cache_clear()
+    _parameters_payload.cache_clear()
+
+
+def load_data():
+    """
+    Return the cached parameters list from database.json.
+    Edits to the file are picked up automatically on the next call.
+    """
+    return _load_payload()[0]
 
 
 def get_db_version():
     """Return a human-readable DB version + date string for display in reports."""
-    try:
-        with open(DB_FILE, 'r', encoding='utf-8-sig') as f:
-            payload = json.load(f)
-        meta = payload.get("_metadata", {})
-        version     = meta.get("db_version")
-        last_update = meta.get("last_updated")
-        # Only return version info if both fields exist
-        if version and last_update:
-            return f"v{version} (updated {last_update})"
-        return ""
-    except Exception:
-        return ""
+    meta        = _load_payload()[1]
+    version     = meta.get("db_version")
+    last_update = meta.get("last_updated")
+    # Only return version info if both fields exist
+    if version and last_update:
+        return f"v{version} (updated {last_update})"
+    return ""
+
+
+# Both accessors share one parsed payload, so clearing either clears both.
+# Kept for callers that still force a reload by hand.
+load_data.cache_clear      = clear_db_cache
+get_db_version.cache_clear = clear_db_cache
+
+
+# Keys of a standard entry in the /api/analyze response shape
+_API_STANDARD_KEYS = ("authority", "status", "limit", "violation", "consequence", "solution")
+
+
+def _api_entry(authority, status, limit, violation="", consequence="", solution=""):
+    """Build a standard entry in the /api/analyze shape (keys as in _API_STANDARD_KEYS)."""
+    return dict(zip(_API_STANDARD_KEYS, (authority, status, limit, violation, consequence, solution)))
+
+
+def _prepare_standard(std):
+    """
+    Return a copy of a standard entry with everything that does not depend on
+    the measured value worked out up front: display labels, numeric limits,
+    the limit string and the ready-made PASS/INFO result entries (in both
+    the full and the API shape).
+    """
+    authority     = format_authority_label(std['authority'])
+    standard_date = std.get('standard_date', 'date unknown')
+    limit_max     = std.get('max_limit')
+    limit_min     = std.get('min_limit')
+
+    # Build limit display string — FIX: plain hyphen avoids em/en-dash encoding crash
+    if limit_min is not None and limit_max is not None:
+        limit_str = f"{limit_min} - {limit_max}"
+    elif limit_max is not None:
+        limit_str = f"Max {limit_max}"
+    elif limit_min is not None:
+        limit_str = f"Min {limit_min}"
+    else:
+        limit_str = "No numeric limit"
+
+    if limit_max is None and limit_min is None:
+        ok_entry = {
+            "authority":     authority,
+            "standard_date": standard_date,
+            "status":        "INFO",
+            "limit":         limit_str,
+            "color":         (0, 0, 200),
+            "symbol":        "s",
+        }
+    else:
+        ok_entry = {
+            "authority":     authority,
+            "standard_date": standard_date,
+            "status":        "PASS",
+            "limit":         limit_str,
+            "color":         (0, 150, 0),
+            "symbol":        "3",
+        }
+
+    return dict(
+        std,
+        _authority=authority,
+        _standard_date=standard_date,
+        _max_num=coerce_numeric(limit_max),
+        _min_num=coerce_numeric(limit_min),
+        _limit_str=limit_str,
+        _ok_entry=ok_entry,
+        _api_ok_entry=_api_entry(authority, ok_entry["status"], limit_str),  # /api/analyze shape
+    )
+
+
+@lru_cache(maxsize=1)
+def _build_param_index():
+    """Build the {name: parameter} map; cleared whenever the DB is reloaded."""
+    return {
+        p["name"]: dict(p, standards=[_prepare_standard(std) for std in p["standards"]])
+        for p in load_data()
+    }
+
+
+def _param_index():
+    """
+    Return a cached {name: parameter} map for O(1) lookups during analysis.
+    Each parameter's standards are pre-processed by _prepare_standard().
+    """
+    _load_payload()  # drops a stale index if database.json has changed
+    return _build_param_index()
 
 
 def get_parameter_names():
@@ -74,6 +255,28 @@ def get_parameter_names():
     return sorted([item["name"] for item in load_data()])
 
 
+@lru_cache(maxsize=2)
+def _parameters_payload(include_version):
+    """Serialize the /api/parameters body; cleared whenever the DB is reloaded."""
+    payload = {"parameters": [{"name": p["name"], "unit": p["unit"]} for p in load_data()]}
+    if include_version:
+        payload["db_version"] = get_db_version()
+    return json_dumps(payload)
+
+
+def get_parameters_payload(include_version):
+    """
+    Return (mtime, body): the serialized /api/parameters JSON body as bytes,
+    plus the database.json mtime it was built from (None if the file is
+    missing), so callers can derive an ETag that always matches the body.
+    The output only changes with the DB, so both variants (with and without
+    the DB version) are cached until database.json is modified.
+    """
+    _load_payload()  # drops a stale body if database.json has changed
+    body = _parameters_payload(include_version)
+    return _CACHE["mtime"], body
+
+
 def format_authority_label(authority):
     """Normalize authority labels for UI/report display."""
     if authority == "NIS 554:2015":
@@ -81,27 +284,61 @@ def format_authority_label(authority):
     return authority
 
 
+# Longest string _sanitize_str() memoizes. DB text (authorities, units,
+# consequences, solutions) fits well within it; longer, request-derived text
+# such as a warning quoting a client-sent name is sanitized uncached, so the
+# cache cannot be filled with large attacker-controlled entries.
+_SANITIZE_CACHE_MAX_LEN = 512
+
+
+def _sanitize_str(text):
+    """
+    Non-ASCII path of sanitize(); pure-ASCII strings are returned before
+    reaching here. Short strings go through the memoized _sanitize_str_cached().
+    """
+    # Step 1: targeted safe substitutions
+    text = text.translate(_TRANS)
+
+    # ASCII is always Latin-1 safe, so the round trip below would be a no-op
+    if text.isascii():
+        return text
+
+    # Step 2: catch-all — any still-unhandled non-Latin-1 chars become '?'
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+# Repeated non-ASCII DB text (e.g. a "µS/cm" unit or a consequence with curly
+# quotes) is substituted only once.
+_sanitize_str_cached = lru_cache(maxsize=2048)(_sanitize_str)
+
+
 def sanitize(text):
     """
     Safely encode text for fpdf, which uses Latin-1 internally.
 
     Strategy (in order):
       1. Replace known problematic Unicode characters with ASCII equivalents
-         using _UNICODE_MAP — prevents the most common encoder crashes.
+         using the _UNICODE_MAP translation table — prevents the most common
+         encoder crashes.
       2. Encode to Latin-1 with 'replace' so any remaining unknown characters
-         appear as '?' in the PDF instead of crashing the generator.
+         appear as '?' in the PDF instead of crashing the generator. Skipped
+         when step 1 leaves only ASCII.
+
+    Pure-ASCII strings are returned unchanged. Results for other strings up
+    to _SANITIZE_CACHE_MAX_LEN characters are cached; call
+    _sanitize_str_cached.cache_clear() to reset.
     """
     if isinstance(text, (int, float)):
         return str(text)
-
+    # Fast path for the common case: every _UNICODE_MAP key is non-ASCII and
+    # ASCII is valid Latin-1, so there is nothing to substitute or encode.
+    # isascii() is an O(1) flag check in CPython — cheaper than the cache lookup.
+    if isinstance(text, str) and text.isascii():
+        return text
     text = str(text)
-
-    # Step 1: targeted safe substitutions
-    for char, replacement in _UNICODE_MAP.items():
-        text = text.replace(char, replacement)
-
-    # Step 2: catch-all — any still-unhandled non-Latin-1 chars become '?'
-    return text.encode('latin-1', 'replace').decode('latin-1')
+    if len(text) <= _SANITIZE_CACHE_MAX_LEN:
+        return _sanitize_str_cached(text)
+    return _sanitize_str(text)
 
 
 def coerce_numeric(value):
@@ -134,6 +371,40 @@ def safe_output_path(directory, filename):
 # INPUT VALIDATION
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _validate_value(name, raw):
+    """
+    Validate a single batch entry's raw value.
+
+    Returns:
+        (value, None)  when valid, with value coerced to float.
+        (None, error)  with a human-readable message otherwise.
+    """
+    # 1. Presence check — numbers (the common case) skip stringification
+    if raw is None:
+        return None, f"'{name}': No value entered."
+    if isinstance(raw, str):
+        if not raw.strip():
+            return None, f"'{name}': No value entered."
+    elif not isinstance(raw, (int, float)) and str(raw).strip() == "":
+        return None, f"'{name}': No value entered."
+
+    # 2. Numeric type check
+    try:
+        value = float(raw)
+    except (ValueError, TypeError):
+        return None, f"'{name}': '{raw}' is not a valid number."
+
+    # 3. Finite number check
+    if math.isnan(value) or math.isinf(value):
+        return None, f"'{name}': Value must be a finite real number."
+
+    # 4. Physical bounds check (sourced from DB)
+    # Do not reject values that fall outside the DB's physical_min/physical_max.
+    # This allows analysis to run for any numeric input while preserving
+    # the other validation (presence, numeric, finite).
+    return value, None
+
+
 def validate_batch(batch_data):
     """
     Validate a list of {"name": str, "value": any} dicts before analysis.
@@ -148,38 +419,15 @@ def validate_batch(batch_data):
         errors  (list[str]): Human-readable messages. Empty list = all clear.
         cleaned (list[dict]): Valid entries with value coerced to float.
     """
-    db        = load_data()
-    param_map = {item["name"]: item for item in db}
-    errors    = []
-    cleaned   = []
+    errors  = []
+    cleaned = []
 
     for item in batch_data:
-        name = item.get("name", "Unknown Parameter")
-        raw  = item.get("value")
-
-        # 1. Presence check
-        if raw is None or str(raw).strip() == "":
-            errors.append(f"'{name}': No value entered.")
+        name         = item.get("name", "Unknown Parameter")
+        value, error = _validate_value(name, item.get("value"))
+        if error:
+            errors.append(error)
             continue
-
-        # 2. Numeric type check
-        try:
-            value = float(raw)
-        except (ValueError, TypeError):
-            errors.append(f"'{name}': '{raw}' is not a valid number.")
-            continue
-
-        # 3. Finite number check
-        if math.isnan(value) or math.isinf(value):
-            errors.append(f"'{name}': Value must be a finite real number.")
-            continue
-
-        # 4. Physical bounds check (sourced from DB)
-        # Keep parameter object for context (units etc.) but do not
-        # reject values that fall outside the DB's physical_min/physical_max.
-        # This change allows analysis to run for any numeric input while
-        # preserving other validation (presence, numeric, finite).
-        param_obj = param_map.get(name)
         cleaned.append({"name": name, "value": value})
 
     return errors, cleaned
@@ -189,18 +437,100 @@ def validate_batch(batch_data):
 # PURE ANALYSIS ENGINE  (no UI or PDF concerns here)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def run_analysis(batch_data):
+def _unknown_parameter_warning(p_name):
+    """Warning text for a batch entry whose parameter is not in the DB."""
+    return (
+        f"'{p_name}': Not found in standards database -- skipped. "
+        f"Check spelling or update database.json."
+    )
+
+
+def _evaluate_parameter(p_name, val, param_obj, api_shape=False):
+    """
+    Check one numeric value against every standard of a prepared parameter.
+    With api_shape, entries and the result use the /api/analyze response shape.
+    """
+    standards_results = []
+    has_fail          = False
+
+    for std in param_obj['standards']:
+        limit_max_num = std['_max_num']
+        limit_min_num = std['_min_num']
+
+        is_unsafe     = False
+        violation_txt = ""
+
+        if limit_max_num is not None and val > limit_max_num:
+            is_unsafe     = True
+            violation_txt = f"> {limit_max_num}"
+
+        # FIX: use `is not None` — catches limit_min == 0 correctly
+        if limit_min_num is not None and val < limit_min_num:
+            is_unsafe     = True
+            violation_txt = f"< {limit_min_num}"
+
+        if is_unsafe and api_shape:
+            has_fail = True
+            entry = _api_entry(
+                std['_authority'], "FAIL", std['_limit_str'],
+                violation_txt, std['consequence'], std['solution'],
+            )
+        elif is_unsafe:
+            has_fail = True
+            entry = {
+                "authority":     std['_authority'],
+                "standard_date": std['_standard_date'],
+                "status":        "FAIL",
+                "limit":         std['_limit_str'],
+                "violation":     violation_txt,
+                "consequence":   std['consequence'],
+                "solution":      std['solution'],
+                "color":         (200, 0, 0),
+                "symbol":        "7",
+            }
+        else:
+            entry = (std['_api_ok_entry'] if api_shape else std['_ok_entry']).copy()
+
+        standards_results.append(entry)
+
+    overall = "FAIL" if has_fail else "PASS"
+    if api_shape:
+        return {
+            "parameter": p_name,
+            "value":     val,
+            "unit":      param_obj['unit'],
+            "status":    overall,
+            "standards": standards_results,
+        }
+
+    return {
+        "parameter":   p_name,
+        "value":       val,
+        "unit":        param_obj['unit'],
+        "value_label": f"{val} {param_obj['unit']}",
+        "overall":     overall,
+        "standards":   standards_results,
+    }
+
+
+def run_analysis(batch_data, api_shape=False):
     """
     Core compliance engine. Accepts validated batch data, returns structured results.
     Does NOT touch the UI or PDF — those are separate concerns.
 
+    With api_shape=True, results are emitted directly in the /api/analyze
+    response shape (overall verdict under "status"; standards carry only
+    authority/status/limit/violation/consequence/solution). Those results
+    are for JSON output only, not for the GUI or PDF renderers.
+
     Returns:
-        results  (list[dict]): One dict per parameter with full compliance detail.
+        results  (list[dict]): One dict per parameter with full compliance detail,
+                               including its "overall" PASS/FAIL verdict.
         warnings (list[str]): Parameters skipped because they weren't found in the DB.
     """
-    db       = load_data()
-    results  = []
-    warnings = []
+    param_map = _param_index()
+    results   = []
+    warnings  = []
 
     for item in batch_data:
         p_name = item['name']
@@ -212,103 +542,74 @@ def run_analysis(batch_data):
             warnings.append(f"'{p_name}': Could not parse value -- skipped.")
             continue
 
-        param_obj = next((x for x in db if x["name"] == p_name), None)
+        param_obj = param_map.get(p_name)
 
         # Warn on unknown parameters rather than silently skipping
         if not param_obj:
-            warnings.append(
-                f"'{p_name}': Not found in standards database -- skipped. "
-                f"Check spelling or update database.json."
-            )
+            warnings.append(_unknown_parameter_warning(p_name))
             continue
 
-        standards_results = []
-
-        for std in param_obj['standards']:
-            authority     = format_authority_label(std['authority'])
-            standard_date = std.get('standard_date', 'date unknown')
-            limit_max     = std.get('max_limit')
-            limit_min     = std.get('min_limit')
-            limit_max_num = coerce_numeric(limit_max)
-            limit_min_num = coerce_numeric(limit_min)
-
-            is_unsafe     = False
-            violation_txt = ""
-
-            if limit_max_num is not None and val > limit_max_num:
-                is_unsafe     = True
-                violation_txt = f"> {limit_max_num}"
-
-            # FIX: use `is not None` — catches limit_min == 0 correctly
-            if limit_min_num is not None and val < limit_min_num:
-                is_unsafe     = True
-                violation_txt = f"< {limit_min_num}"
-
-            # Build limit display string — FIX: plain hyphen avoids em/en-dash encoding crash
-            if limit_min is not None and limit_max is not None:
-                limit_str = f"{limit_min} - {limit_max}"
-            elif limit_max is not None:
-                limit_str = f"Max {limit_max}"
-            elif limit_min is not None:
-                limit_str = f"Min {limit_min}"
-            else:
-                limit_str = "No numeric limit"
-
-            if is_unsafe:
-                entry = {
-                    "authority":     authority,
-                    "standard_date": standard_date,
-                    "status":        "FAIL",
-                    "limit":         limit_str,
-                    "violation":     violation_txt,
-                    "consequence":   std['consequence'],
-                    "solution":      std['solution'],
-                    "color":         (200, 0, 0),
-                    "symbol":        "7",
-                }
-            elif limit_max is None and limit_min is None:
-                entry = {
-                    "authority":     authority,
-                    "standard_date": standard_date,
-                    "status":        "INFO",
-                    "limit":         limit_str,
-                    "color":         (0, 0, 200),
-                    "symbol":        "s",
-                }
-            else:
-                entry = {
-                    "authority":     authority,
-                    "standard_date": standard_date,
-                    "status":        "PASS",
-                    "limit":         limit_str,
-                    "color":         (0, 150, 0),
-                    "symbol":        "3",
-                }
-
-            standards_results.append(entry)
-
-        results.append({
-            "parameter": p_name,
-            "value":     val,
-            "unit":      param_obj['unit'],
-            "standards": standards_results,
-        })
+        results.append(_evaluate_parameter(p_name, val, param_obj, api_shape))
 
     return results, warnings
 
 
+def analyze_batch_fused(batch_data, api_shape=False):
+    """
+    Validate and analyse a raw batch in a single pass.
+
+    Equivalent to validate_batch() followed by run_analysis(), without the
+    intermediate cleaned list or the second float cast. Once any entry fails
+    validation the remaining entries are only validated, since results are
+    discarded whenever there are errors. api_shape is as for run_analysis().
+
+    Returns:
+        errors   (list[str]): Validation error strings. Empty = all inputs valid.
+        results  (list[dict]): Same shape as run_analysis() ([] if errors).
+        warnings (list[str]): Skipped-parameter notices ([] if errors).
+    """
+    param_map = _param_index()
+    errors    = []
+    results   = []
+    warnings  = []
+
+    for item in batch_data:
+        name         = item.get("name", "Unknown Parameter")
+        value, error = _validate_value(name, item.get("value"))
+        if error:
+            errors.append(error)
+            continue
+        if errors:
+            continue
+
+        param_obj = param_map.get(name)
+
+        # Warn on unknown parameters rather than silently skipping
+        if not param_obj:
+            warnings.append(_unknown_parameter_warning(name))
+            continue
+
+        results.append(_evaluate_parameter(name, value, param_obj, api_shape))
+
+    if errors:
+        return errors, [], []
+    return errors, results, warnings
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # GUI TEXT RENDERER
 # ─────────────────────────────────────────────────────────────────────────────
 
-def build_gui_output(results, warnings):
+def build_gui_output(results, warnings, generated_at=None):
     """
     Convert structured analysis results into a flat list of (tag, text) tuples
     for the frontend/UI to render with appropriate styling.
+    generated_at (datetime) defaults to now.
     """
+    generated_at = generated_at or datetime.datetime.now()
     gui = []
     gui.append(("HEADER", "COMPREHENSIVE ANALYSIS REPORT"))
-    gui.append(("NORMAL", f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}"))
+    gui.append(("NORMAL", f"Date: {generated_at.strftime('%Y-%m-%d %H:%M')}"))
     gui.append(("NORMAL", f"Standards database: {get_db_version()}"))
     gui.append(("NORMAL", "=" * 60))
 
@@ -316,7 +617,7 @@ def build_gui_output(results, warnings):
         gui.append(("WARNING", f"WARNING: {w}"))
 
     for res in results:
-        gui.append(("SUBHEADER", f">> {res['parameter']}  ({res['value']} {res['unit']})"))
+        gui.append(("SUBHEADER", f">> {res['parameter']}  ({res['value_label']})"))
 
         for std in res['standards']:
             date_label = f" [standard dated {std['standard_date']}]"
@@ -338,25 +639,43 @@ def build_gui_output(results, warnings):
 # PDF RENDERER
 # ─────────────────────────────────────────────────────────────────────────────
 
-def save_comprehensive_pdf(results, warnings, output_dir="reports"):
+# Fixed report text. Plain ASCII, so it is written without sanitize() —
+# keep it that way (or wrap it in sanitize()) if it is ever edited.
+_REPORT_TITLE = "Comprehensive Water Quality Report"
+_FOOTER_TEXT  = (
+    "Report generated by Water Quality Compliance Suite  |  "
+    "Standards: WHO GDWQ 4th Ed. (2022) & NAFDAC(NIS 554:2015)  |  "
+    "Always verify against the latest published standards."
+)
+
+
+def report_filename(generated_at):
+    """Return the timestamped download/save name for a report generated at generated_at."""
+    return f"Analysis_Report_{generated_at.strftime('%Y%m%d_%H%M%S')}.pdf"
+
+
+def _render_pdf(results, warnings, generated_at=None):
     """
-    Render structured analysis results to a professional PDF report.
+    Lay out structured analysis results as a professional PDF report.
 
-    All text is passed through sanitize() before being written to PDF,
+    All dynamic text is passed through sanitize() before being written to PDF,
     which handles Unicode characters that fpdf's Latin-1 engine cannot encode.
+    Fixed ASCII labels are written as-is.
+    generated_at (datetime) is the timestamp printed in the header; defaults to now.
 
     Returns:
-        filepath (str): Absolute path to the generated PDF file.
+        pdf (FPDF): The rendered document, ready for output().
     """
+    generated_at = generated_at or datetime.datetime.now()
     pdf = FPDF()
     pdf.add_page()
 
     # ── Title block ───────────────────────────────────────────────────────────
     pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, "Comprehensive Water Quality Report", ln=True, align='C')
+    pdf.cell(0, 10, _REPORT_TITLE, ln=True, align='C')
 
     pdf.set_font("Arial", 'I', 9)
-    pdf.cell(0, 6, f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+    pdf.cell(0, 6, f"Generated: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
     pdf.cell(0, 6, sanitize(f"Standards database: {get_db_version()}"), ln=True, align='C')
     pdf.ln(6)
 
@@ -383,13 +702,10 @@ def save_comprehensive_pdf(results, warnings, output_dir="reports"):
 
     pdf.set_font("Arial", '', 10)
     for res in results:
-        overall = "UNSAFE" if any(s['status'] == "FAIL" for s in res['standards']) else "SAFE"
-        label   = f"{res['value']} {res['unit']}"
-
         pdf.cell(65, 8, sanitize(res['parameter']), 1)
-        pdf.cell(40, 8, sanitize(label), 1, 0, 'C')
+        pdf.cell(40, 8, sanitize(res['value_label']), 1, 0, 'C')
 
-        if overall == "UNSAFE":
+        if res['overall'] == "FAIL":
             pdf.set_text_color(200, 0, 0)
             pdf.cell(85, 8, "FLAGGED -- see details below", 1, 1)
         else:
@@ -406,7 +722,7 @@ def save_comprehensive_pdf(results, warnings, output_dir="reports"):
     for res in results:
         pdf.set_font("Arial", 'B', 11)
         pdf.set_text_color(200, 150, 0)
-        pdf.cell(0, 8, sanitize(f"  {res['parameter']}  (Result: {res['value']} {res['unit']})"), ln=True)
+        pdf.cell(0, 8, sanitize(f"  {res['parameter']}  (Result: {res['value_label']})"), ln=True)
         pdf.set_text_color(0, 0, 0)
 
         for std in res['standards']:
@@ -415,13 +731,13 @@ def save_comprehensive_pdf(results, warnings, output_dir="reports"):
             # Authority line with standard date
             pdf.set_text_color(r, g, b)
             pdf.set_font("Arial", 'B', 10)
-            status_line = sanitize(
+            status_line = (
                 f"    [{std['authority']}]  {std['status']}  --  Limit: {std['limit']}"
                 f"  (Standard dated: {std['standard_date']})"
             )
             if std['status'] == "FAIL":
-                status_line = sanitize(status_line + f"  Violation: {std['violation']}")
-            pdf.cell(0, 6, status_line, ln=True)
+                status_line += f"  Violation: {std['violation']}"
+            pdf.cell(0, 6, sanitize(status_line), ln=True)
 
             # Consequence and solution for failures
             pdf.set_text_color(50, 50, 50)
@@ -438,126 +754,35 @@ def save_comprehensive_pdf(results, warnings, output_dir="reports"):
     pdf.set_font("Arial", 'I', 8)
     pdf.set_text_color(120, 120, 120)
     # Use multi_cell so long footer text wraps instead of being clipped.
-    footer_text = sanitize(
-        "Report generated by Water Quality Compliance Suite  |  "
-        "Standards: WHO GDWQ 4th Ed. (2022) & NAFDAC(NIS 554:2015)  |  "
-        "Always verify against the latest published standards."
-    )
-    pdf.multi_cell(0, 5, footer_text, align='C')
+    pdf.multi_cell(0, 5, _FOOTER_TEXT, align='C')
+
+    return pdf
 
-    # ── Save with full timestamp to prevent filename collisions ───────────────
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename  = f"Analysis_Report_{timestamp}.pdf"
-    filepath  = safe_output_path(output_dir, filename)
+
+def save_comprehensive_pdf(results, warnings, output_dir="reports"):
+    """
+    Render structured analysis results to a PDF report on disk.
+
+    Returns:
+        filepath (str): Absolute path to the generated PDF file.
+    """
+    generated_at = datetime.datetime.now()
+    pdf          = _render_pdf(results, warnings, generated_at)
+
+    # Save with full timestamp to prevent filename collisions
+    filepath = safe_output_path(output_dir, report_filename(generated_at))
     pdf.output(filepath)
     return filepath
 
 
-def generate_comprehensive_pdf_bytes(results, warnings):
+def generate_comprehensive_pdf_bytes(results, warnings, generated_at=None):
     """Render structured analysis results and return PDF bytes (no disk writes).
 
-    This function mirrors save_comprehensive_pdf but returns the PDF
+    Uses the same layout as save_comprehensive_pdf but returns the PDF
     as bytes so the calling code can stream it directly to the user
     without persisting it on the server.
     """
-    pdf = FPDF()
-    pdf.add_page()
-
-    # ── Title block ───────────────────────────────────────────────────────────
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, "Comprehensive Water Quality Report", ln=True, align='C')
-
-    pdf.set_font("Arial", 'I', 9)
-    pdf.cell(0, 6, f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
-    pdf.cell(0, 6, sanitize(f"Standards database: {get_db_version()}"), ln=True, align='C')
-    pdf.ln(6)
-
-    # ── Warnings block ────────────────────────────────────────────────────────
-    if warnings:
-        pdf.set_font("Arial", 'B', 11)
-        pdf.set_text_color(180, 100, 0)
-        pdf.cell(0, 8, "NOTICES:", ln=True)
-        pdf.set_font("Arial", '', 9)
-        for w in warnings:
-            pdf.multi_cell(0, 5, sanitize(f"  - {w}"))
-        pdf.set_text_color(0, 0, 0)
-        pdf.ln(4)
-
-    # ── Summary table ─────────────────────────────────────────────────────────
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "1. SUMMARY OF RESULTS", ln=True)
-
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(240, 240, 240)
-    pdf.cell(65, 8, "Parameter",       1, 0, 'L', True)
-    pdf.cell(40, 8, "Value",           1, 0, 'C', True)
-    pdf.cell(85, 8, "Overall Status",  1, 1, 'L', True)
-
-    pdf.set_font("Arial", '', 10)
-    for res in results:
-        overall = "UNSAFE" if any(s['status'] == "FAIL" for s in res['standards']) else "SAFE"
-        label   = f"{res['value']} {res['unit']}"
-
-        pdf.cell(65, 8, sanitize(res['parameter']), 1)
-        pdf.cell(40, 8, sanitize(label), 1, 0, 'C')
-
-        if overall == "UNSAFE":
-            pdf.set_text_color(200, 0, 0)
-            pdf.cell(85, 8, "FLAGGED -- see details below", 1, 1)
-        else:
-            pdf.set_text_color(0, 150, 0)
-            pdf.cell(85, 8, "PASSED ALL STANDARDS", 1, 1)
-        pdf.set_text_color(0, 0, 0)
-
-    pdf.ln(8)
-
-    # ── Detailed breakdown ────────────────────────────────────────────────────
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "2. DETAILED ANALYSIS & SOLUTIONS", ln=True)
-
-    for res in results:
-        pdf.set_font("Arial", 'B', 11)
-        pdf.set_text_color(200, 150, 0)
-        pdf.cell(0, 8, sanitize(f"  {res['parameter']}  (Result: {res['value']} {res['unit']})"), ln=True)
-        pdf.set_text_color(0, 0, 0)
-
-        for std in res['standards']:
-            r, g, b = std['color']
-
-            # Authority line with standard date
-            pdf.set_text_color(r, g, b)
-            pdf.set_font("Arial", 'B', 10)
-            status_line = sanitize(
-                f"    [{std['authority']}]  {std['status']}  --  Limit: {std['limit']}"
-                f"  (Standard dated: {std['standard_date']})"
-            )
-            if std['status'] == "FAIL":
-                status_line = sanitize(status_line + f"  Violation: {std['violation']}")
-            pdf.cell(0, 6, status_line, ln=True)
-
-            # Consequence and solution for failures
-            pdf.set_text_color(50, 50, 50)
-            pdf.set_font("Arial", '', 10)
-            if std['status'] == "FAIL":
-                pdf.multi_cell(0, 5, sanitize(f"        Risk:     {std['consequence']}"))
-                pdf.multi_cell(0, 5, sanitize(f"        Solution: {std['solution']}"))
-                pdf.ln(2)
-
-        pdf.set_text_color(0, 0, 0)
-        pdf.ln(3)
-
-    # ── Footer ────────────────────────────────────────────────────────────────
-    pdf.set_font("Arial", 'I', 8)
-    pdf.set_text_color(120, 120, 120)
-    footer_text = sanitize(
-        "Report generated by Water Quality Compliance Suite  |  "
-        "Standards: WHO GDWQ 4th Ed. (2022) & NAFDAC(NIS 554:2015)  |  "
-        "Always verify against the latest published standards."
-    )
-    pdf.multi_cell(0, 5, footer_text, align='C')
-
-    # Return PDF bytes instead of writing to disk
-    raw = pdf.output(dest='S')
+    raw = _render_pdf(results, warnings, generated_at).output(dest='S')
     # FPDF returns a str for 'S' output — encode to latin-1 to preserve characters
     if isinstance(raw, str):
         raw = raw.encode('latin-1')
@@ -568,27 +793,41 @@ def generate_comprehensive_pdf_bytes(results, warnings):
 # PUBLIC ENTRY POINT  (called by app.py)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def analyze_batch(batch_data, output_dir="reports"):
+def analyze_batch(batch_data, output_dir="reports", build_gui=True, api_shape=False,
+                  generated_at=None):
     """
     Main entry point for app.py.
 
     Workflow:
-      1. Validate inputs         -- returns errors immediately if any are invalid.
-      2. Run pure analysis       -- structured results + skip warnings.
-      3. Build GUI text output   -- list of (tag, text) tuples for the UI.
+      1. Validate + analyse      -- one pass via analyze_batch_fused(); returns
+                                    errors immediately if any are invalid,
+                                    otherwise structured results + skip warnings.
+      2. Build GUI text output   -- list of (tag, text) tuples for the UI.
+                                    Skipped when build_gui is False (e.g. PDF-only callers).
+
+    Pass api_shape=True to get pdf_results already in the /api/analyze
+    response shape; see run_analysis(). Those results cannot be rendered as
+    GUI text, so api_shape=True also skips step 2.
+
+    generated_at (datetime) is the timestamp shown in the GUI header. It
+    defaults to a single datetime.now() taken here; callers that also render
+    a PDF for the batch can pass the same value to keep both in step.
 
     Returns:
-        gui_text    (list): (tag, text) tuples for the UI to render.
+        gui_text    (list): (tag, text) tuples for the UI to render
+                            ([] if build_gui is False or api_shape is True).
         pdf_results (list): Structured result dicts for save_comprehensive_pdf().
         val_errors  (list): Validation error strings. Empty = all inputs valid.
         warnings    (list): Skipped-parameter notices.
     """
-    val_errors, cleaned = validate_batch(batch_data)
+    val_errors, results, warnings = analyze_batch_fused(batch_data, api_shape)
 
     if val_errors:
         return [], [], val_errors, []
 
-    results, warnings = run_analysis(cleaned)
-    gui_text          = build_gui_output(results, warnings)
+    gui_text = []
+    if build_gui and not api_shape:
+        generated_at = generated_at or datetime.datetime.now()
+        gui_text     = build_gui_output(results, warnings, generated_at)
 
     return gui_text, results, [], warnings